@@ -1,11 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File, Response
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import text
-from app.db.session import get_db
+from app.db.session import get_db, SessionLocal
 from app.db.models import Image, Face, Person
-from app.api.schemas import ImageResponse, ImageSearchResponse
+from app.api.schemas import ImageResponse, ImageSearchResponse, BatchUploadResult
 from app.services.storage import storage_service
 from app.ai.face_service import face_service
+from app.services.admission import admission_controller, queue_time_header
+from app.services.recognition_cache import recognition_cache, GalleryChangeTracker, GALLERY_BUMP_INTERVAL
 import uuid
 import asyncio
 import math
@@ -16,6 +20,7 @@ router = APIRouter()
 
 @router.post("/", response_model=ImageResponse)
 async def upload_image(
+  response: Response,
   file: UploadFile = File(...),
   db: Session = Depends(get_db)
 ):
@@ -23,32 +28,42 @@ async def upload_image(
     Upload a single image for search.
     Image will be scanned for faces, recognized against existing persons, and indexed.
     """
-    # 1. Save
-    try:
-        saved_path = storage_service.save_file(file)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Could not save file: {e}")
-        
-    # 2. Detect
-    try:
-        faces = await face_service.detect_faces_async(saved_path)
-    except Exception as e:
-        # cleanup
-        os.remove(saved_path)
-        raise HTTPException(status_code=500, detail=f"AI processing failed: {e}")
+    async with admission_controller.bulk.admit() as queue_time:
+        response.headers["X-Queue-Time-Ms"] = queue_time_header(queue_time)
+
+        # 1. Save
+        try:
+            saved_path = storage_service.save_file(file)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Could not save file: {e}")
+            
+        # 2. Detect
+        try:
+            faces = await face_service.detect_faces_async(saved_path)
+        except Exception as e:
+            # cleanup
+            os.remove(saved_path)
+            raise HTTPException(status_code=500, detail=f"AI processing failed: {e}")
         
-    # 3. Create Image Record
-    db_image = Image(file_path=saved_path, is_sample=False)
-    db.add(db_image)
-    db.flush()
-    
-    # 4. Process Faces
+    # 3. Create Image Record & process faces
+    db_image = _save_image(db, saved_path, faces)
+
+    # Auto-labelled faces join the known gallery
+    if _has_known_faces(db_image):
+        recognition_cache.bump_gallery_version()
+
+    return db_image
+
+def _index_faces(db: Session, db_image: Image, faces):
+    """
+    Match each detected face against known persons and add it to the session.
+    """
     THRESHOLD = 0.5
-    
+
     for face in faces:
         embedding = face.embedding
-        
-        # Find nearest person
+
+        # Find nearest face that HAS a person_id
         search_embedding = embedding.tolist()
 
         distance_col = Face.embedding.cosine_distance(search_embedding).label('distance')
@@ -61,13 +76,13 @@ async def upload_image(
         ).order_by(
             distance_col
         ).limit(1).first()
-        
+
         matched_person_id = None
         if result:
             distance = result[1]
             if distance < THRESHOLD:
                 matched_person_id = result[0]
-        
+
         # Save Face
         db_face = Face(
             image_id=db_image.id,
@@ -76,98 +91,171 @@ async def upload_image(
             box=face.bbox.astype(int).tolist()
         )
         db.add(db_face)
-        
-    db.commit()
+
+def _save_image(db: Session, saved_path: str, faces) -> Image:
+    """
+    Create the image record for an already saved file, index its faces and commit.
+    Rolls back on failure so the session stays usable for the next file.
+    """
+    try:
+        db_image = Image(file_path=saved_path, is_sample=False)
+        db.add(db_image)
+        db.flush()
+
+        _index_faces(db, db_image, faces)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
     db.refresh(db_image)
-    
     return db_image
 
-@router.post("/batch", response_model=List[ImageResponse])
+def _has_known_faces(db_image: Image) -> bool:
+    return any(f.person_id for f in db_image.faces)
+
+def _remove_saved_file(saved_path: str):
+    # Same cleanup as upload_image, but never let it break the stream
+    try:
+        os.remove(saved_path)
+    except OSError:
+        pass
+
+async def _stream_batch(saved_files, ticket):
+    """
+    Yield one NDJSON line per file as soon as it is committed.
+    Uses its own session so it does not depend on the request scope,
+    which may already be closed while the body is streamed.
+    The whole batch holds the single bulk slot claimed by the handler (ticket),
+    since files are processed one at a time; it is released when the stream ends.
+    """
+    db = SessionLocal()
+    # Auto-labelled faces join the known gallery as each file commits;
+    # bumps are throttled so ingest doesn't wipe the cache after every image.
+    gallery_changes = GalleryChangeTracker(recognition_cache, GALLERY_BUMP_INTERVAL)
+    try:
+        for index, (filename, saved_path, error) in enumerate(saved_files):
+            if error is not None:
+                result = BatchUploadResult(filename=filename, status="error", detail=error)
+            else:
+                try:
+                    faces = await face_service.detect_faces_async(saved_path)
+                except Exception as e:
+                    faces = None
+                    _remove_saved_file(saved_path)
+                    result = BatchUploadResult(
+                        filename=filename,
+                        status="error",
+                        detail=f"AI processing failed: {e}"
+                    )
+
+                if faces is not None:
+                    try:
+                        db_image = _save_image(db, saved_path, faces)
+                        gallery_changes.record(_has_known_faces(db_image))
+                        result = BatchUploadResult(
+                            filename=filename,
+                            status="ok",
+                            image=ImageResponse.model_validate(db_image)
+                        )
+                    except Exception as e:
+                        _remove_saved_file(saved_path)
+                        result = BatchUploadResult(
+                            filename=filename,
+                            status="error",
+                            detail=f"Database error: {e}"
+                        )
+
+            if index == 0:
+                result.queue_time_ms = round(ticket.queue_time * 1000, 1)
+
+            # Drop ORM state for this file so memory stays bounded by one image
+            db.expunge_all()
+            yield result.model_dump_json() + "\n"
+    finally:
+        db.close()
+        ticket.release()
+        gallery_changes.flush()
+
+@router.post(
+    "/batch",
+    response_model=List[ImageResponse],
+    responses={
+        200: {
+            "description": "JSON array of images, or with ?stream=true an NDJSON stream "
+                           "where each line is a BatchUploadResult.",
+            "content": {"application/x-ndjson": {}}
+        }
+    }
+)
 async def upload_batch(
+    response: Response,
     files: List[UploadFile] = File(...),
+    stream: bool = Query(False),
     db: Session = Depends(get_db)
 ):
     """
     Batch upload images for search.
     Images will be scanned for faces, recognized against existing persons, and indexed.
+    If stream is true, results are sent as NDJSON (one BatchUploadResult per line)
+    as soon as each file is committed, including per-file failures.
     """
+    if stream:
+        # Claim the bulk slot before writing anything, so a burst of streamed
+        # batches is bounded by the queue limit like every other request.
+        ticket = await admission_controller.bulk.acquire()
+        try:
+            # Save uploads up front: the multipart spool files may be closed
+            # once the endpoint returns, before the body is streamed.
+            saved_files = []
+            for file in files:
+                try:
+                    saved_files.append((file.filename, storage_service.save_file(file), None))
+                except Exception as e:
+                    saved_files.append((file.filename, None, f"Could not save file: {e}"))
+        except BaseException:
+            ticket.release()
+            raise
+
+        # The stream releases the slot when it ends; the background task covers
+        # a client that disconnects before the stream is ever started.
+        return StreamingResponse(
+            _stream_batch(saved_files, ticket),
+            media_type="application/x-ndjson",
+            headers={"X-Queue-Time-Ms": queue_time_header(ticket.queue_time)},
+            background=BackgroundTask(ticket.release)
+        )
+
     uploaded_images = []
+    gallery_changes = GalleryChangeTracker(recognition_cache, GALLERY_BUMP_INTERVAL)
     
-    for file in files:
-        # 1. Save
-        try:
-            saved_path = storage_service.save_file(file)
-        except Exception as e:
-            print(f"Failed to save {file.filename}: {e}")
-            continue
-            
-        # 2. Detect
+    async with admission_controller.bulk.admit() as queue_time:
+        response.headers["X-Queue-Time-Ms"] = queue_time_header(queue_time)
+
+        # Files commit one by one, so bump even if a later file fails or the request is cancelled
         try:
-            faces = await face_service.detect_faces_async(saved_path)
-        except Exception as e:
-            print(f"Failed to detect {file.filename}: {e}")
-            continue
-            
-        # 3. Create Image Record
-        db_image = Image(file_path=saved_path, is_sample=False)
-        db.add(db_image)
-        db.flush()
-        
-        # 4. Process Faces
-        THRESHOLD = 0.5
-        
-        for face in faces:
-            embedding = face.embedding
-            
-            # Find nearest person
-            # Reuse logic from recognition.py? Ideally refactor to service.
-            # For now, duplicate snippet for speed.
-            
-            # Only checking against samples? Or all faces?
-            # Typically recognition checks against "known persons". 
-            # In our DB, persons are defined by Faces linked to them.
-            # So we query nearest face that HAS a person_id.
-
-            # query = text("""
-            #     SELECT f.person_id, f.embedding <=> :embedding as distance
-            #     FROM faces f
-            #     WHERE f.person_id IS NOT NULL
-            #     ORDER BY distance ASC
-            #     LIMIT 1
-            # """)
-            
-            # result = db.execute(query, {"embedding": str(embedding.tolist())}).first()
-            search_embedding = embedding.tolist()
-
-            distance_col = Face.embedding.cosine_distance(search_embedding).label('distance')
-
-            result = db.query(
-                Face.person_id,
-                distance_col
-            ).filter(
-                Face.person_id != None
-            ).order_by(
-                distance_col
-            ).limit(1).first()
-            
-            matched_person_id = None
-            if result:
-                distance = result[1]
-                if distance < THRESHOLD:
-                    matched_person_id = result[0]
-            
-            # Save Face
-            db_face = Face(
-                image_id=db_image.id,
-                person_id=matched_person_id,
-                embedding=embedding,
-                box=face.bbox.astype(int).tolist()
-            )
-            db.add(db_face)
-            
-        db.commit()
-        db.refresh(db_image)
-        uploaded_images.append(db_image)
+            for file in files:
+                # 1. Save
+                try:
+                    saved_path = storage_service.save_file(file)
+                except Exception as e:
+                    print(f"Failed to save {file.filename}: {e}")
+                    continue
+                
+                # 2. Detect
+                try:
+                    faces = await face_service.detect_faces_async(saved_path)
+                except Exception as e:
+                    print(f"Failed to detect {file.filename}: {e}")
+                    continue
+
+                # 3. Create Image Record & process faces
+                db_image = _save_image(db, saved_path, faces)
+                gallery_changes.record(_has_known_faces(db_image))
+
+                uploaded_images.append(db_image)
+        finally:
+            gallery_changes.flush()
 
     return uploaded_images
 
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Response
 from sqlalchemy.orm import Session
 from app.db.session import get_db
 from app.db.models import Person, Image, Face
 from app.api.schemas import PersonCreate, PersonResponse, ImageResponse, PersonFromFace
 from app.services.storage import storage_service
 from app.ai.face_service import face_service
+from app.services.admission import admission_controller, queue_time_header
+from app.services.recognition_cache import recognition_cache
 import uuid
 import os
 
@@ -62,6 +64,7 @@ def create_person_from_face(data: PersonFromFace, db: Session = Depends(get_db))
         f.person_id = new_person.id
         
     db.commit()
+    recognition_cache.bump_gallery_version()
     db.refresh(new_person)
     return new_person
 
@@ -91,11 +94,13 @@ def delete_person(person_id: uuid.UUID, db: Session = Depends(get_db)):
 
     db.delete(person)
     db.commit()
+    recognition_cache.bump_gallery_version()
     return {"ok": True}
 
 @router.post("/{person_id}/images")
 async def upload_person_image(
     person_id: uuid.UUID, 
+    response: Response,
     file: UploadFile = File(...), 
     db: Session = Depends(get_db)
 ):
@@ -112,24 +117,27 @@ async def upload_person_image(
     # if we run from backend root. Let's fix that instantiation in storage.py or main.py
     # Assumed we run from `backend/` folder.
     
-    try:
-        # Save temp file or permanent file right away? 
-        # Requirement: Save local (dev)
-        saved_path = storage_service.save_file(file)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Could not save file: {e}")
+    async with admission_controller.interactive.admit() as queue_time:
+        response.headers["X-Queue-Time-Ms"] = queue_time_header(queue_time)
 
-    # 2. Detect & Encode
-    try:
-        # face_service.get_embedding expects a path string
-        embedding = await face_service.get_embedding_async(saved_path)
-        if embedding is None:
-            # Clean up image if no face found? Maybe keep it for debug?
-            # For now, error out
-            os.remove(saved_path)
-            raise HTTPException(status_code=400, detail="No face detected in image")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"AI processing failed: {e}")
+        try:
+            # Save temp file or permanent file right away? 
+            # Requirement: Save local (dev)
+            saved_path = storage_service.save_file(file)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Could not save file: {e}")
+
+        # 2. Detect & Encode
+        try:
+            # face_service.get_embedding expects a path string
+            embedding = await face_service.get_embedding_async(saved_path)
+            if embedding is None:
+                # Clean up image if no face found? Maybe keep it for debug?
+                # For now, error out
+                os.remove(saved_path)
+                raise HTTPException(status_code=400, detail="No face detected in image")
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"AI processing failed: {e}")
 
     # 3. Save to DB
     try:
@@ -146,6 +154,7 @@ async def upload_person_image(
         )
         db.add(db_face)
         db.commit()
+        recognition_cache.bump_gallery_version()
         
         return {"message": "Image uploaded and face encoded", "image_id": db_image.id, "face_id": db_face.id}
         
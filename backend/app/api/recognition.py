@@ -1,34 +1,55 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from app.db.session import get_db
 from app.db.models import Face, Person
 from app.services.storage import storage_service
 from app.ai.face_service import face_service
+from app.services.admission import admission_controller, queue_time_header
+from app.services.recognition_cache import recognition_cache
 from app.api.schemas import RecognitionResponse, FaceRecognition
 import os
 import shutil
+import hashlib
 
 router = APIRouter()
 
 @router.post("/recognize", response_model=RecognitionResponse)
 async def recognize_faces(
+    response: Response,
     file: UploadFile = File(...),
     db: Session = Depends(get_db)
 ):
-    # 1. Save file
-    try:
-        saved_path = storage_service.save_file(file)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Could not save file: {e}")
+    # Same image + same gallery -> same answer; skip disk, detection and DB entirely.
+    # Hash the spooled upload in chunks rather than reading it all into memory.
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: file.file.read(64 * 1024), b""):
+        digest.update(chunk)
+    file.file.seek(0)
+    cache_key = recognition_cache.key_from_digest(digest.hexdigest())
+    cached = recognition_cache.get(cache_key)
+    if cached is not None:
+        response.headers["X-Cache"] = "HIT"
+        return cached
+    response.headers["X-Cache"] = "MISS"
 
-    # 2. Detect & Encode all faces
-    try:
-        faces = await face_service.detect_faces_async(saved_path)
-    except Exception as e:
-        # cleanup
-        os.remove(saved_path)
-        raise HTTPException(status_code=500, detail=f"AI processing failed: {e}")
+    # Interactive lane: rejected with 503 instead of queueing behind bulk ingest
+    async with admission_controller.interactive.admit() as queue_time:
+        response.headers["X-Queue-Time-Ms"] = queue_time_header(queue_time)
+
+        # 1. Save file
+        try:
+            saved_path = storage_service.save_file(file)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Could not save file: {e}")
+
+        # 2. Detect & Encode all faces
+        try:
+            faces = await face_service.detect_faces_async(saved_path)
+        except Exception as e:
+            # cleanup
+            os.remove(saved_path)
+            raise HTTPException(status_code=500, detail=f"AI processing failed: {e}")
 
     results = []
     
@@ -49,19 +70,20 @@ async def recognize_faces(
         # We want the single closest match across all faces in DB
         # Note: We query the 'faces' table, but we want the 'Person' details.
         
-        # SQL equivalent:
-        # SELECT f.id, f.person_id, p.name, f.embedding <=> :emb as distance
-        # FROM faces f
-        # JOIN persons p ON f.person_id = p.id
-        # ORDER BY distance ASC
-        # LIMIT 1
+        # The explicit "person_id IS NOT NULL" routes the search to the
+        # ix_faces_embedding_known partial index (labelled faces only).
+        # The nearest face is found first, then joined to its person.
         
         query = text("""
-            SELECT f.id, f.person_id, p.name, f.embedding <=> :embedding as distance
-            FROM faces f
+            SELECT f.id, f.person_id, p.name, f.distance
+            FROM (
+                SELECT id, person_id, embedding <=> :embedding as distance
+                FROM faces
+                WHERE person_id IS NOT NULL
+                ORDER BY embedding <=> :embedding
+                LIMIT 1
+            ) f
             JOIN persons p ON f.person_id = p.id
-            ORDER BY distance ASC
-            LIMIT 1
         """)
         
         # pgvector expects a list or array for the vector
@@ -86,4 +108,11 @@ async def recognize_faces(
             distance=float(distance)
         ))
 
-    return RecognitionResponse(faces=results)
+    recognition_response = RecognitionResponse(faces=results)
+    # Budget by serialized size, which tracks the in-memory footprint closely enough
+    recognition_cache.put(cache_key, recognition_response, len(recognition_response.model_dump_json()))
+    return recognition_response
+
+@router.get("/recognize/cache")
+def recognition_cache_stats():
+    return recognition_cache.stats()
@@ -54,3 +54,10 @@ class FaceRecognition(BaseModel):
 
 class RecognitionResponse(BaseModel):
     faces: List[FaceRecognition]
+
+class BatchUploadResult(BaseModel):
+    filename: Optional[str]
+    status: str # "ok" or "error"
+    image: Optional[ImageResponse] = None
+    detail: Optional[str] = None
+    queue_time_ms: Optional[float] = None # set on the first line only
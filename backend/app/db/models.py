@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, func, Boolean, Index
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, func, Boolean, Index, text
 from sqlalchemy.dialects.postgresql import UUID, ARRAY, INTEGER
 from sqlalchemy.orm import relationship
 from pgvector.sqlalchemy import Vector
@@ -43,16 +43,30 @@ class Face(Base):
 
     created_at = Column(DateTime, default=func.now())
     
-    # Add IVFFlat index for faster cosine distance search
-    # Note: 'lists' parameter should ideally be ~ sqrt(rows). 100 is good for up to ~10k rows.
+    # Known (labelled) and unknown faces get separate partial vector indexes, so
+    # "nearest known person" searches a small dense index instead of filtering
+    # an ANN index built mostly from unknown faces.
+    # Queries must repeat the exact predicate (person_id IS [NOT] NULL) for the
+    # planner to pick the partial index.
     # vector_cosine_ops is required for the <=> operator.
     __table_args__ = (
+        # HNSW needs no training step, so it stays accurate while the gallery is small.
         Index(
-            'ix_faces_embedding',
+            'ix_faces_embedding_known',
+            'embedding',
+            postgresql_using='hnsw',
+            postgresql_with={'m': 16, 'ef_construction': 64},
+            postgresql_ops={'embedding': 'vector_cosine_ops'},
+            postgresql_where=text('person_id IS NOT NULL')
+        ),
+        # Note: 'lists' parameter should ideally be ~ sqrt(rows). 100 is good for up to ~10k rows.
+        Index(
+            'ix_faces_embedding_unknown',
             'embedding',
             postgresql_using='ivfflat',
             postgresql_with={'lists': 100},
-            postgresql_ops={'embedding': 'vector_cosine_ops'}
+            postgresql_ops={'embedding': 'vector_cosine_ops'},
+            postgresql_where=text('person_id IS NULL')
         ),
     )
 
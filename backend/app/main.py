@@ -3,6 +3,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 from sqlalchemy import text
 from app.db.session import engine, Base
+from app.db.models import Face
 from app.api import persons, recognition, images
 from fastapi.staticfiles import StaticFiles
 from typing import AsyncGenerator
@@ -23,6 +24,18 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
   Base.metadata.create_all(bind=engine)
   print("Database tables created")
 
+  # create_all only builds indexes for new tables; migrate existing ones
+  # from the single embedding index to the known/unknown partial indexes.
+  try:
+    with engine.connect() as connection:
+      connection.execute(text("DROP INDEX IF EXISTS ix_faces_embedding"))
+      connection.commit()
+    for index in Face.__table__.indexes:
+      index.create(bind=engine, checkfirst=True)
+    print("Face vector indexes ready")
+  except Exception as e:
+    print(f"Error creating face indexes: {e}")
+
   yield # The application will now start processing requests
 
   # Code to run on application shutdown
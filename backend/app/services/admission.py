@@ -0,0 +1,97 @@
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from fastapi import HTTPException
+
+class AdmissionTicket:
+    """
+    A claimed slot in a lane. release() is idempotent, so a slot handed to a
+    streamed response can be released by both the stream and a cleanup task.
+    """
+    def __init__(self, lane, queue_time):
+        self.lane = lane
+        self.queue_time = queue_time
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.lane._semaphore.release()
+
+class AdmissionLane:
+    """
+    Bounds concurrent inference work for one class of endpoints.
+    At most max_concurrency requests run, at most max_queue wait behind them,
+    and anything beyond that is rejected immediately with 503 + Retry-After.
+    """
+    def __init__(self, name, max_concurrency, max_queue, retry_after=1):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._waiting = 0
+
+    @property
+    def waiting(self):
+        return self._waiting
+
+    def is_full(self):
+        return self._semaphore.locked() and self._waiting >= self.max_queue
+
+    def raise_if_full(self):
+        if self.is_full():
+            raise HTTPException(
+                status_code=503,
+                detail=f"Server busy ({self.name} queue full), retry later",
+                headers={"Retry-After": str(self.retry_after)}
+            )
+
+    async def acquire(self):
+        """
+        Wait for a slot, failing fast if the queue is full. The caller must release the ticket.
+        """
+        self.raise_if_full()
+
+        start = time.perf_counter()
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+
+        return AdmissionTicket(self, time.perf_counter() - start)
+
+    @asynccontextmanager
+    async def admit(self):
+        """
+        Wait for a slot and yield the time spent queued (seconds).
+        """
+        ticket = await self.acquire()
+        try:
+            yield ticket.queue_time
+        finally:
+            ticket.release()
+
+class AdmissionController:
+    def __init__(self):
+        # Interactive + bulk concurrency should not exceed the FaceService worker count,
+        # so interactive requests never wait in the executor behind bulk ingest.
+        self.interactive = AdmissionLane(
+            "interactive",
+            max_concurrency=int(os.getenv("ADMISSION_INTERACTIVE_CONCURRENCY", 2)),
+            max_queue=int(os.getenv("ADMISSION_INTERACTIVE_QUEUE", 8)),
+            retry_after=int(os.getenv("ADMISSION_INTERACTIVE_RETRY_AFTER", 1))
+        )
+        self.bulk = AdmissionLane(
+            "bulk",
+            max_concurrency=int(os.getenv("ADMISSION_BULK_CONCURRENCY", 2)),
+            max_queue=int(os.getenv("ADMISSION_BULK_QUEUE", 16)),
+            retry_after=int(os.getenv("ADMISSION_BULK_RETRY_AFTER", 5))
+        )
+
+def queue_time_header(queue_time):
+    return f"{queue_time * 1000:.1f}"
+
+admission_controller = AdmissionController()
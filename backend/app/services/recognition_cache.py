@@ -0,0 +1,115 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+class RecognitionCache:
+    """
+    LRU + TTL cache for /recognize responses, keyed by image content hash and gallery version.
+    Any change to the set of known faces must call bump_gallery_version(),
+    which makes every existing entry unreachable (they age out through LRU/TTL).
+    """
+    def __init__(self, max_bytes=32 * 1024 * 1024, ttl=300):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.gallery_version = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict() # key -> (expires_at, size, value)
+        self._size = 0
+        # persons endpoints are sync and run in the threadpool
+        self._lock = threading.Lock()
+
+    def key(self, content: bytes):
+        return self.key_from_digest(hashlib.sha256(content).hexdigest())
+
+    def key_from_digest(self, digest: str):
+        """
+        Build a key from a precomputed content hash, e.g. one streamed from a spooled upload.
+        """
+        with self._lock:
+            version = self.gallery_version
+        return (digest, version)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key, value, size: int):
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            # Result was computed against an older gallery; don't store it
+            if key[1] != self.gallery_version:
+                return
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (time.monotonic() + self.ttl, size, value)
+            self._size += size
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def bump_gallery_version(self):
+        with self._lock:
+            self.gallery_version += 1
+            # Old entries can never be hit again, free them right away
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "gallery_version": self.gallery_version
+            }
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._size -= size
+
+class GalleryChangeTracker:
+    """
+    Throttled gallery version bumps for batch ingest.
+    Call record() after each committed image and flush() when the batch ends.
+    A bump happens at most once per `interval` seconds, so cached answers lag
+    committed auto-labelled faces by at most that long instead of a whole batch.
+    """
+    def __init__(self, cache, interval=1.0):
+        self.cache = cache
+        self.interval = interval
+        self.pending = False
+        self._last_bump = float("-inf")
+
+    def record(self, changed: bool):
+        self.pending = self.pending or changed
+        if self.pending and time.monotonic() - self._last_bump >= self.interval:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            self.cache.bump_gallery_version()
+            self.pending = False
+            self._last_bump = time.monotonic()
+
+recognition_cache = RecognitionCache(
+    max_bytes=int(os.getenv("RECOGNITION_CACHE_MAX_BYTES", 32 * 1024 * 1024)),
+    ttl=int(os.getenv("RECOGNITION_CACHE_TTL", 300))
+)
+
+GALLERY_BUMP_INTERVAL = float(os.getenv("RECOGNITION_CACHE_BUMP_INTERVAL", 1.0))
@@ -0,0 +1,207 @@
+"""
+Embedding snapshots: export the `faces` table to memory-mapped .npy files and load it back.
+
+Each export is written to its own generation directory next to the target path,
+and the target path itself is a symlink that is swapped atomically to the new one:
+    snapshots/latest -> latest.gen-20261019T120000Z-1a2b3c4d
+
+Layout of a generation directory:
+    embeddings.npy  (N, 512) float32 or float16, row i belongs to ids.npy[i]
+    ids.npy         (N,) structured array of 16-byte UUIDs: id, person_id, image_id
+                    (a NULL person_id is stored as all zero bytes)
+    meta.json       count, dim, dtype, generation, created_at
+
+Usage (from `backend/`):
+    python -m app.services.snapshot export snapshots/latest --dtype float16
+    python -m app.services.snapshot import snapshots/latest
+"""
+import argparse
+import json
+import os
+import shutil
+import uuid
+from datetime import datetime, timezone
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.db.models import Face
+from app.services.recognition_cache import recognition_cache
+
+EMBEDDING_DIM = 512
+ID_DTYPE = np.dtype([('id', 'V16'), ('person_id', 'V16'), ('image_id', 'V16')])
+NULL_UUID = bytes(16)
+
+EMBEDDINGS_FILE = "embeddings.npy"
+IDS_FILE = "ids.npy"
+META_FILE = "meta.json"
+
+def _uuid_bytes(value):
+    return value.bytes if value is not None else NULL_UUID
+
+def _bytes_uuid(value):
+    value = bytes(value)
+    return uuid.UUID(bytes=value) if value != NULL_UUID else None
+
+def export_snapshot(db: Session, directory: str, dtype: str = "float32", chunk_size: int = 10000, keep: int = 2) -> int:
+    """
+    Stream all faces into a new snapshot generation, chunk_size rows at a time,
+    then atomically point the `directory` symlink at it. Readers either see the
+    previous generation or the new one, never a mix. The newest `keep` generations
+    are kept so readers that resolved the link just before the swap can still open it.
+    Returns the number of exported faces.
+    """
+    link = os.path.normpath(directory)
+    if os.path.isdir(link) and not os.path.islink(link):
+        raise ValueError(f"{link} is a plain directory; snapshots are published as a symlink")
+
+    parent = os.path.dirname(link) or "."
+    os.makedirs(parent, exist_ok=True)
+    prefix = f"{os.path.basename(link)}.gen-"
+    generation = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}-{uuid.uuid4().hex[:8]}"
+    generation_directory = os.path.join(parent, prefix + generation)
+    os.makedirs(generation_directory)
+
+    try:
+        count = _write_snapshot(db, generation_directory, dtype, chunk_size, generation)
+    except BaseException:
+        shutil.rmtree(generation_directory, ignore_errors=True)
+        raise
+
+    # os.replace over an existing symlink is a single atomic rename
+    tmp_link = f"{link}.link-{uuid.uuid4().hex}"
+    os.symlink(os.path.basename(generation_directory), tmp_link)
+    os.replace(tmp_link, link)
+
+    # Generation names sort by creation time
+    generations = sorted(
+        name for name in os.listdir(parent)
+        if name.startswith(prefix) and os.path.isdir(os.path.join(parent, name))
+    )
+    for name in generations[:-keep]:
+        if name == os.path.basename(generation_directory):
+            continue
+        shutil.rmtree(os.path.join(parent, name), ignore_errors=True)
+
+    return count
+
+def _write_snapshot(db: Session, directory: str, dtype: str, chunk_size: int, generation: str) -> int:
+    # Count and rows must come from the same view of the table. Use a dedicated
+    # connection: the isolation level can't be changed on a transaction the
+    # caller's session may already have started.
+    with db.get_bind().connect() as connection:
+        connection = connection.execution_options(isolation_level="REPEATABLE READ")
+        with Session(bind=connection) as snapshot_db:
+            count = snapshot_db.query(func.count(Face.id)).filter(Face.embedding != None).scalar()
+
+            embeddings = np.lib.format.open_memmap(
+                os.path.join(directory, EMBEDDINGS_FILE), mode="w+",
+                dtype=np.dtype(dtype), shape=(count, EMBEDDING_DIM)
+            )
+            ids = np.lib.format.open_memmap(
+                os.path.join(directory, IDS_FILE), mode="w+",
+                dtype=ID_DTYPE, shape=(count,)
+            )
+
+            rows = snapshot_db.query(
+                Face.id, Face.person_id, Face.image_id, Face.embedding
+            ).filter(
+                Face.embedding != None
+            ).order_by(Face.id).yield_per(chunk_size)
+
+            i = 0
+            for face_id, person_id, image_id, embedding in rows:
+                if i >= count:
+                    raise RuntimeError("faces changed during export; count and rows disagree")
+                embeddings[i] = embedding
+                ids[i] = (face_id.bytes, _uuid_bytes(person_id), _uuid_bytes(image_id))
+                i += 1
+                if i % chunk_size == 0:
+                    embeddings.flush()
+                    ids.flush()
+
+            embeddings.flush()
+            ids.flush()
+            del embeddings, ids
+
+    with open(os.path.join(directory, META_FILE), "w") as f:
+        json.dump({
+            "count": i,
+            "dim": EMBEDDING_DIM,
+            "dtype": dtype,
+            "generation": generation,
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }, f)
+
+    return i
+
+def load_snapshot(directory: str):
+    """
+    Memory-map a snapshot. Returns (embeddings, ids, meta) without reading the arrays into RAM.
+    """
+    # Resolve the symlink once so all three files come from the same generation,
+    # even if an export swaps the link while we are opening them.
+    directory = os.path.realpath(directory)
+
+    with open(os.path.join(directory, META_FILE)) as f:
+        meta = json.load(f)
+
+    embeddings = np.load(os.path.join(directory, EMBEDDINGS_FILE), mmap_mode="r")
+    ids = np.load(os.path.join(directory, IDS_FILE), mmap_mode="r")
+    count = meta["count"]
+    if len(embeddings) < count or len(ids) < count:
+        raise ValueError(f"Snapshot at {directory} is incomplete")
+
+    return embeddings[:count], ids[:count], meta
+
+def import_snapshot(db: Session, directory: str, chunk_size: int = 10000) -> int:
+    """
+    Bulk-load a snapshot into `faces`. Faces whose id already exists are skipped.
+    Referenced images and persons must already exist in the target database.
+    Returns the number of rows read from the snapshot.
+    """
+    embeddings, ids, meta = load_snapshot(directory)
+
+    for start in range(0, meta["count"], chunk_size):
+        chunk_embeddings = np.asarray(embeddings[start:start + chunk_size], dtype=np.float32)
+        chunk_ids = ids[start:start + chunk_size]
+
+        values = [
+            {
+                "id": _bytes_uuid(row["id"]),
+                "person_id": _bytes_uuid(row["person_id"]),
+                "image_id": _bytes_uuid(row["image_id"]),
+                "embedding": embedding
+            }
+            for row, embedding in zip(chunk_ids, chunk_embeddings)
+        ]
+        db.execute(insert(Face).on_conflict_do_nothing(index_elements=[Face.id]), values)
+        db.commit()
+
+    # Imported labelled faces join the known gallery. This only reaches the cache
+    # of the current process; a server running elsewhere must be restarted or
+    # wait out the cache TTL.
+    recognition_cache.bump_gallery_version()
+
+    return meta["count"]
+
+if __name__ == "__main__":
+    from app.db.session import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Export/import face embedding snapshots")
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("directory")
+    parser.add_argument("--dtype", choices=["float32", "float16"], default="float32")
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.command == "export":
+            n = export_snapshot(db, args.directory, dtype=args.dtype, chunk_size=args.chunk_size)
+            print(f"Exported {n} faces to {args.directory}")
+        else:
+            n = import_snapshot(db, args.directory, chunk_size=args.chunk_size)
+            print(f"Imported {n} faces from {args.directory}")
+    finally:
+        db.close()